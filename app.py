@@ -7,23 +7,68 @@ and translating them using DeepSeek AI.
 """
 
 import os
+import io
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from flask import Flask, render_template, request, jsonify, send_file
-from werkzeug.utils import secure_filename
-import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
+import openpyxl
+import xlrd
+import xlsxwriter
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # Optional Rust-backed Excel reader; openpyxl/xlrd are used without it
+    CalamineWorkbook = None
 import tempfile
-import json
+import hashlib
+import re
+import threading
+import logging
+import logging.handlers
+import queue
+import sys
+import atexit
+from collections import OrderedDict, deque
 from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
+# Log through a queue so request and API worker threads never block on
+# stdout writes; a single background listener thread does the actual I/O
+LOG_QUEUE = queue.Queue(-1)
+LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, logging.StreamHandler(sys.stdout))
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())  # DEBUG traces every question and API call
+logger.addHandler(logging.handlers.QueueHandler(LOG_QUEUE))
+logger.propagate = False
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop)
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster jsonify responses."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 def create_app():
     """Create and configure the Flask application."""
     
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -31,6 +76,10 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
     app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls'}
     app.config['MAX_QUESTIONS'] = int(os.getenv('MAX_QUESTIONS', 1000))
+    app.config['BATCH_SIZE'] = int(os.getenv('BATCH_SIZE', 10))  # Questions per request (Heroku timeout)
+    app.config['DEEPSEEK_BATCH_SIZE'] = int(os.getenv('DEEPSEEK_BATCH_SIZE', 5))  # Questions per API call
+    app.config['DEEPSEEK_CONCURRENCY'] = int(os.getenv('DEEPSEEK_CONCURRENCY', 16))  # Parallel API calls
+    app.config['BATCH_TIMEOUT'] = float(os.getenv('BATCH_TIMEOUT', 25))  # Seconds per batch, under Heroku's 30s limit
     
     # DeepSeek API configuration
     app.config['DEEPSEEK_API_KEY'] = os.getenv('DEEPSEEK_API_KEY')
@@ -39,14 +88,162 @@ def create_app():
     # Test mode configuration
     app.config['TEST_MODE'] = os.getenv('TEST_MODE', 'false').lower() == 'true'
     
+    # Cache of completed results, keyed by uploaded file hash
+    app.config['CACHE_TYPE'] = os.getenv('CACHE_TYPE', 'FileSystemCache')
+    app.config['CACHE_DIR'] = os.path.join(tempfile.gettempdir(), 'survey_cache')
+    app.config['CACHE_DEFAULT_TIMEOUT'] = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 86400))  # 24 hours
+    
     return app
 
 app = create_app()
+cache = Cache(app)
+
+# Surface a missing API key once at startup instead of only as per-question errors
+if not app.config['TEST_MODE'] and not app.config['DEEPSEEK_API_KEY']:
+    logger.warning("⚠️  DEEPSEEK_API_KEY is not set; translations will fail until it is configured")
+
+# Retry a DeepSeek call once, and only when it cannot have produced a billed
+# answer: a failed connect or a 429/5xx reply. A read timeout is not retried,
+# since the request was delivered and may still be generating. Retry-After is
+# ignored because urllib3 does not cap it; a single retry is sent immediately.
+DEEPSEEK_RETRY = Retry(
+    total=1,
+    connect=1,
+    read=0,
+    status=1,
+    other=0,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=['POST'],  # DeepSeek calls are POSTs, which urllib3 does not retry by default
+    respect_retry_after_header=False,
+    raise_on_status=False  # Hand the last 429/5xx back so it is reported as an API error
+)
+DEEPSEEK_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection to DeepSeek
+
+# Shared HTTP session so DeepSeek calls reuse pooled keep-alive connections
+# instead of paying a new TCP/TLS handshake per request. HTTP/1.1 carries one
+# request per connection at a time, so the pool holds one connection per API
+# worker thread, and pool_block makes a thread wait for a pooled connection
+# rather than opening (and then discarding) an extra one.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,  # Only api.deepseek.com is called
+    pool_maxsize=app.config['DEEPSEEK_CONCURRENCY'],
+    pool_block=True,
+    max_retries=DEEPSEEK_RETRY
+))
+SESSION.headers.update({'Content-Type': 'application/json'})
+
+# Shared progress state is written by request and API worker threads. Every
+# change is published once as a serialized, numbered snapshot and wakes SSE
+# streams waiting on the condition; recent snapshots are kept so reconnecting
+# clients can replay what they missed via Last-Event-ID
+PROGRESS_CONDITION = threading.Condition()
+PROGRESS_EVENTS = deque(maxlen=256)  # (version, status, payload) tuples
+SSE_HEARTBEAT_INTERVAL = 5  # Seconds of silence before /progress sends a keep-alive
+app.progress_version = 0
+
+# Progress fields coerced to plain ints on write, so whatever numeric types the
+# readers and the API hand back always serialize as JSON integers
+PROGRESS_INT_FIELDS = frozenset(('current_question', 'total_questions', 'current_row', 'confidence'))
+
+# DeepSeek instructions, built once and sent as the system message. The question
+# text goes alone in the user message after them, so every call shares the same
+# prompt prefix and DeepSeek's context cache bills it at the cache-hit rate
+QUESTION_SYSTEM_PROMPT = """Detect the language of the text in the user message, provide a confidence score, and translate it to English.
+Maintain the original meaning and tone. If the text is already in English, set "english_translation" to null
+instead of repeating the text.
+Preserve any HTML tags like <i>, <em>, <strong>, etc.
+
+Respond with ONLY a valid JSON object in this exact format (no markdown, no code blocks):
+{
+    "language": "detected_language_name",
+    "confidence": confidence_score,
+    "english_translation": "english_translation_text"
+}"""
+
+# Reply token budget per question; a JSON reply with one translation fits comfortably
+QUESTION_MAX_TOKENS = 512
+
+BATCH_SYSTEM_PROMPT = """For each numbered text in the user message, detect its language, provide a confidence score, and translate it to English.
+Maintain the original meaning and tone. If a text is already in English, set its "english_translation" to null
+instead of repeating the text.
+Preserve any HTML tags like <i>, <em>, <strong>, etc.
+
+Respond with ONLY a valid JSON object in this exact format (no markdown, no code blocks),
+with one entry per text, where "n" is the number of the text:
+{
+    "results": [
+        {"n": 1, "language": "detected_language_name", "confidence": confidence_score, "english_translation": "english_translation_text"}
+    ]
+}"""
+
+# Short items with no letters (answer codes like "99" or "1.", bare punctuation)
+# have nothing to translate, so they are answered locally without an API call
+UNTRANSLATABLE_PATTERN = re.compile(r'[\s\d\W]{0,8}')
+
+# Outermost {...} block of a model reply, ignoring code fences or prose around it
+JSON_BLOCK_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
+# In-process LRU cache of translations keyed by question text hash, so repeated
+# survey items (demographics, consent, Likert scales) are only sent once
+TRANSLATION_CACHE = OrderedDict()
+TRANSLATION_CACHE_LOCK = threading.Lock()
+TRANSLATION_CACHE_SIZE = 10000
+
+# Process-wide pool for DeepSeek calls. API calls are network-bound, so threads
+# overlap them despite the GIL, and sharing one pool across requests lets all
+# in-flight uploads multiplex onto the same bounded set of connections without
+# blocking a WSGI worker per outstanding call.
+API_EXECUTOR = ThreadPoolExecutor(
+    max_workers=app.config['DEEPSEEK_CONCURRENCY'],
+    thread_name_prefix='deepseek'
+)
+
+class CompletedCounter:
+    """Count of questions finished by the parallel API workers of one batch."""
+    
+    def __init__(self, start):
+        self.lock = threading.Lock()
+        self.count = start
+    
+    def add(self, finished):
+        """Add ``finished`` questions and return the new total."""
+        with self.lock:
+            self.count += finished
+            return self.count
+
+# Frozen copy of the allowed extensions, so validation skips the config lookup
+ALLOWED_EXTENSIONS = frozenset(app.config['ALLOWED_EXTENSIONS'])
+
+def set_progress(fields, replace=False):
+    """Apply a progress update (or start fresh with ``replace``) and publish it.
+    
+    Updates are ignored while no processing has started, so translation helpers
+    can report progress even when called outside an upload.
+    """
+    fields = {
+        field: int(value) if field in PROGRESS_INT_FIELDS else value
+        for field, value in fields.items()
+    }
+    with PROGRESS_CONDITION:
+        if replace:
+            app.current_progress = fields
+        elif hasattr(app, 'current_progress'):
+            app.current_progress.update(fields)
+        else:
+            return
+        
+        # Writes that leave the state unchanged are not republished
+        payload = orjson.dumps(app.current_progress)
+        if PROGRESS_EVENTS and PROGRESS_EVENTS[-1][2] == payload:
+            return
+        app.progress_version += 1
+        PROGRESS_EVENTS.append((app.progress_version, app.current_progress.get('status'), payload))
+        PROGRESS_CONDITION.notify_all()
 
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return os.path.splitext(filename)[1][1:].lower() in ALLOWED_EXTENSIONS
 
 @app.route('/')
 def index():
@@ -64,45 +261,55 @@ def test_endpoint():
 
 @app.route('/progress', methods=['GET'])
 def progress_stream():
-    """Stream real-time progress updates with Heroku timeout handling."""
+    """Stream real-time progress updates with Heroku timeout handling.
+    
+    Each event carries its progress version as the SSE id, so a client that
+    reconnects with Last-Event-ID resumes from the next version; new clients
+    start from the latest snapshot.
+    """
+    with PROGRESS_CONDITION:
+        latest_version = app.progress_version
+    try:
+        last_version = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_version = latest_version - 1
+    if not 0 <= last_version <= latest_version:
+        last_version = max(latest_version - 1, 0)
+    
     def generate():
-        start_time = time.time()
-        last_progress = None
+        start_time = time.monotonic()
+        last_sent = last_version
         
         while True:
             # Check for timeout (15 seconds to be safe on Heroku)
-            if time.time() - start_time > 15:
+            remaining = 15 - (time.monotonic() - start_time)
+            if remaining <= 0:
                 # Send a keepalive message and break
-                yield f"data: {json.dumps({'status': 'timeout', 'message': 'Connection timeout - please reconnect'})}\n\n"
+                yield b"data: " + orjson.dumps({'status': 'timeout', 'message': 'Connection timeout - please reconnect'}) + b"\n\n"
                 break
             
-            # Get the latest progress from global state
-            if hasattr(app, 'current_progress'):
-                progress_data = app.current_progress.copy()
-                
-                # Convert numpy types to standard Python types for JSON serialization
-                if 'current_question' in progress_data:
-                    progress_data['current_question'] = int(progress_data['current_question'])
-                if 'total_questions' in progress_data:
-                    progress_data['total_questions'] = int(progress_data['total_questions'])
-                if 'current_row' in progress_data:
-                    progress_data['current_row'] = int(progress_data['current_row'])
-                if 'confidence' in progress_data:
-                    progress_data['confidence'] = int(progress_data['confidence'])
-                
-                # Only send if data has changed or it's been more than 0.5 seconds
-                current_time = time.time()
-                if (last_progress != progress_data or 
-                    current_time - start_time > 0.5):
-                    yield f"data: {json.dumps(progress_data)}\n\n"
-                    last_progress = progress_data.copy()
-                    
-                    # If processing is complete, break the connection
-                    if progress_data.get('status') in ['completed', 'error']:
-                        break
+            # Sleep until a producer publishes a change, waking at least every
+            # few seconds to keep idle connections open through proxies
+            with PROGRESS_CONDITION:
+                changed = PROGRESS_CONDITION.wait_for(
+                    lambda: app.progress_version > last_sent,
+                    timeout=min(SSE_HEARTBEAT_INTERVAL, remaining)
+                )
+                events = [event for event in PROGRESS_EVENTS if event[0] > last_sent] if changed else []
             
-            # Shorter sleep for more responsive updates
-            time.sleep(0.2)
+            if not changed:
+                # SSE comment line; EventSource clients ignore it
+                yield b": keep-alive\n\n"
+                continue
+            
+            for version, status, payload in events:
+                # Published payloads are already orjson bytes; frame them as-is
+                yield b"id: %d\ndata: %s\n\n" % (version, payload)
+                last_sent = version
+                
+                # If processing is complete, break the connection
+                if status in ['completed', 'error']:
+                    return
     
     return app.response_class(
         generate(),
@@ -120,17 +327,8 @@ def progress_stream():
 def progress_simple():
     """Simple progress endpoint for polling (fallback when SSE fails)."""
     if hasattr(app, 'current_progress'):
-        progress_data = app.current_progress.copy()
-        
-        # Convert numpy types to standard Python types for JSON serialization
-        if 'current_question' in progress_data:
-            progress_data['current_question'] = int(progress_data['current_question'])
-        if 'total_questions' in progress_data:
-            progress_data['total_questions'] = int(progress_data['total_questions'])
-        if 'current_row' in progress_data:
-            progress_data['current_row'] = int(progress_data['current_row'])
-        if 'confidence' in progress_data:
-            progress_data['confidence'] = int(progress_data['confidence'])
+        with PROGRESS_CONDITION:
+            progress_data = app.current_progress.copy()
         
         return jsonify(progress_data)
     else:
@@ -151,9 +349,9 @@ def progress_simple():
 def continue_batch():
     """Continue processing the next batch of questions."""
     try:
-        print("\n" + "="*50)
-        print("🔄 CONTINUE BATCH PROCESSING")
-        print("="*50)
+        logger.info("=" * 50)
+        logger.info("🔄 CONTINUE BATCH PROCESSING")
+        logger.info("=" * 50)
         
         # Check if there are pending questions
         if not hasattr(app, 'pending_questions') or not hasattr(app, 'current_batch_start'):
@@ -165,30 +363,26 @@ def continue_batch():
         if current_batch_start >= total_questions:
             return jsonify({'error': 'All questions have been processed'}), 400
         
-        print(f"📊 Continuing from question {current_batch_start + 1}")
-        print(f"📊 Remaining questions: {total_questions - current_batch_start}")
+        logger.info(f"📊 Continuing from question {current_batch_start + 1}")
+        logger.info(f"📊 Remaining questions: {total_questions - current_batch_start}")
         
-        # Create a temporary file path for the batch processing
-        # Since we don't have the original file, we'll use a dummy path
-        # The actual questions are stored in app.pending_questions
-        dummy_filepath = "/tmp/batch_continuation.xlsx"
-        
-        # Process the next batch
-        result = process_excel_file_with_timeout(dummy_filepath)
+        # The questions are stored in app.pending_questions, so there is no
+        # need to re-read the original file
+        result = process_next_batch()
         
         return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Error continuing batch: {str(e)}")
+        logger.exception(f"❌ Error continuing batch: {str(e)}")
         return jsonify({'error': f'Batch continuation error: {str(e)}'}), 500
 
 @app.route('/auto-continue-batch', methods=['POST'])
 def auto_continue_batch():
     """Automatically continue processing batches until completion."""
     try:
-        print("\n" + "="*50)
-        print("🤖 AUTO BATCH PROCESSING")
-        print("="*50)
+        logger.info("=" * 50)
+        logger.info("🤖 AUTO BATCH PROCESSING")
+        logger.info("=" * 50)
         
         # Check if there are pending questions
         if not hasattr(app, 'pending_questions') or not hasattr(app, 'current_batch_start'):
@@ -200,224 +394,98 @@ def auto_continue_batch():
         if current_batch_start >= total_questions:
             return jsonify({'error': 'All questions have been processed'}), 400
         
-        print(f"📊 Auto-continuing from question {current_batch_start + 1}")
-        print(f"📊 Remaining questions: {total_questions - current_batch_start}")
+        logger.info(f"📊 Auto-continuing from question {current_batch_start + 1}")
+        logger.info(f"📊 Remaining questions: {total_questions - current_batch_start}")
         
         # Process batches automatically until completion
         batch_count = 0
         
-        while current_batch_start < total_questions:
+        while True:
             batch_count += 1
-            print(f"\n🔄 Processing auto-batch {batch_count}")
-            
-            # Calculate batch end
-            batch_size = 3  # Same as in process_excel_file_with_timeout
-            batch_end = min(current_batch_start + batch_size, total_questions)
-            
-            # Process the current batch
-            batch_results = []
-            start_time = time.time()
-            
-            for i, question in enumerate(app.pending_questions[current_batch_start:batch_end]):
-                # Check for Heroku timeout (25 seconds)
-                if time.time() - start_time > 25:
-                    print(f"⚠️ Heroku timeout approaching, stopping batch {batch_count}")
-                    # Mark remaining questions in this batch as pending
-                    for j in range(i, batch_end - current_batch_start):
-                        batch_results.append({
-                            'question_number': current_batch_start + j + 1,
-                            'row_number': current_batch_start + j + 1,
-                            'original_question': app.pending_questions[current_batch_start + j],
-                            'detected_language': 'Pending (timeout)',
-                            'confidence': 0,
-                            'english_translation': 'Processing stopped due to timeout'
-                        })
-                    break
-                
-                # Process the question
-                global_question_index = current_batch_start + i
-                row_number = global_question_index + 1
-                
-                # Update progress for current question
-                app.current_progress.update({
-                    'status': 'processing_question',
-                    'message': f'Processing question {global_question_index + 1}/{total_questions} (Row {row_number})',
-                    'current_question': global_question_index + 1,
-                    'current_row': row_number,
-                    'detected_language': 'Analyzing...',
-                    'confidence': 0,
-                    'translation': 'Waiting for language detection...',
-                    'processing_time': f'{global_question_index + 1}/{total_questions} questions processed',
-                    'api_response_time': 'Language detection in progress...'
-                })
-                
-                # Force a small delay to ensure progress is updated
-                time.sleep(0.1)
-                
-                print(f"\n--- Question {global_question_index + 1}/{total_questions} (Row {row_number}) ---")
-                print(f"📝 Original: {question[:100]}{'...' if len(question) > 100 else ''}")
-                
-                try:
-                    result = process_question(question, global_question_index + 1, row_number)
-                    batch_results.append(result)
-                    
-                    # Update progress with results
-                    app.current_progress.update({
-                        'detected_language': result['detected_language'],
-                        'confidence': result['confidence'],
-                        'translation': result['english_translation'][:100] + ('...' if len(result['english_translation']) > 100 else ''),
-                        'api_response_time': 'Translation completed'
-                    })
-                    
-                    # Force a small delay to ensure progress is updated
-                    time.sleep(0.1)
-                    
-                    print(f"✅ Question {global_question_index + 1} (Row {row_number}) processed successfully")
-                    print(f"   Language: {result['detected_language']}")
-                    print(f"   Confidence: {result['confidence']}%")
-                    print(f"   Translation: {result['english_translation'][:50]}{'...' if len(result['english_translation']) > 50 else ''}")
-                except Exception as e:
-                    print(f"❌ Error processing question {global_question_index + 1} (Row {row_number}): {str(e)}")
-                    # Add error result but continue processing
-                    batch_results.append({
-                        'question_number': global_question_index + 1,
-                        'row_number': row_number,
-                        'original_question': question,
-                        'detected_language': 'Error',
-                        'confidence': 0,
-                        'english_translation': f'Processing error: {str(e)}'
-                    })
-                    
-                    # Update progress with error
-                    app.current_progress.update({
-                        'detected_language': 'Error',
-                        'confidence': 0,
-                        'translation': f'Processing error: {str(e)}',
-                        'api_response_time': 'Error occurred'
-                    })
+            logger.info(f"🔄 Processing auto-batch {batch_count}")
             
-            # Add batch results to processed results
-            app.processed_results.extend(batch_results)
+            result = process_next_batch()
             
-            # Update batch start for next batch
-            app.current_batch_start = batch_end
-            
-            # Check if all questions are processed
-            if batch_end >= total_questions:
-                # All questions processed
-                processed_count = len([r for r in app.processed_results if r['detected_language'] not in ['Error', 'Pending (timeout)']])
-                pending_count = len([r for r in app.processed_results if r['detected_language'] == 'Pending (timeout)'])
-                
-                completion_message = f'Processing completed! {processed_count}/{total_questions} questions processed'
-                if pending_count > 0:
-                    completion_message += f' ({pending_count} pending due to timeout)'
-                
-                app.current_progress.update({
-                    'status': 'completed',
-                    'message': completion_message,
-                    'current_question': total_questions,
-                    'detected_language': 'Multiple languages detected',
-                    'confidence': 0,
-                    'translation': f'{processed_count}/{total_questions} questions translated to English',
-                    'processing_time': f'Total: {processed_count} questions processed',
-                    'api_response_time': 'Processing completed'
-                })
-                
-                # Clear session data
-                delattr(app, 'pending_questions')
-                delattr(app, 'processed_results')
-                delattr(app, 'current_batch_start')
-                
-                print(f"✅ All batches completed after {batch_count} iterations")
+            if result['batch_complete']:
+                logger.info(f"✅ All batches completed after {batch_count} iterations")
                 break
-            
-            # Small delay between batches to prevent overwhelming the system
-            time.sleep(0.5)
         
         # Return final results
-        final_result = {
-            'success': True,
-            'results': app.processed_results,
-            'total_questions': total_questions,
-            'processed_at': datetime.now().isoformat(),
-            'batch_complete': True,
+        result.update({
             'auto_processed': True,
             'batches_processed': batch_count
-        }
+        })
         
-        return jsonify(final_result)
+        return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Error in auto batch processing: {str(e)}")
+        logger.exception(f"❌ Error in auto batch processing: {str(e)}")
         return jsonify({'error': f'Auto batch processing error: {str(e)}'}), 500
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and process survey questions."""
-    print("\n" + "="*60)
-    print("🚀 UPLOAD REQUEST RECEIVED")
-    print("="*60)
+    logger.info("=" * 60)
+    logger.info("🚀 UPLOAD REQUEST RECEIVED")
+    logger.info("=" * 60)
     
     try:
         # Check if file was uploaded
         if 'file' not in request.files:
-            print("❌ No file in request.files")
+            logger.error("❌ No file in request.files")
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
-        print(f"✅ File received: {file.filename}")
-        print(f"✅ File size: {len(file.read())} bytes")
-        file.seek(0)  # Reset file pointer
+        logger.info(f"✅ File received: {file.filename}")
+        logger.info(f"✅ Request size: {request.content_length} bytes")
         
         # Check if file was selected
         if file.filename == '':
-            print("❌ No file selected")
+            logger.error("❌ No file selected")
             return jsonify({'error': 'No file selected'}), 400
         
         # Validate file type
         if not allowed_file(file.filename):
-            print(f"❌ Invalid file type: {file.filename}")
+            logger.error(f"❌ Invalid file type: {file.filename}")
             return jsonify({'error': 'Invalid file type. Please upload an Excel file (.xlsx or .xls)'}), 400
         
-        print(f"✅ File type validated: {file.filename}")
+        logger.info(f"✅ File type validated: {file.filename}")
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        print(f"✅ File saved to: {filepath}")
+        # The upload is parsed straight from the request stream and never
+        # saved, so the client filename is only used for its extension
+        filename = file.filename
+        
+        # Re-uploads of an already translated file are served from the cache
+        file_hash = upload_file_hash(file.stream)
+        if not app.config.get('TEST_MODE', False):
+            cached_result = cache.get(upload_cache_key(file_hash))
+            if cached_result:
+                logger.info(f"♻️  Returning cached results for {filename}")
+                return jsonify(cached_result)
         
         try:
-            # Process the file with timeout handling
-            print("🔄 Starting file processing...")
-            result = process_excel_file_with_timeout(filepath)
-            print("✅ File processing completed successfully")
+            # Process the uploaded stream with timeout handling
+            logger.info("🔄 Starting file processing...")
+            result = process_excel_file_with_timeout(file.stream, filename, file_hash)
+            logger.info("✅ File processing completed successfully")
             return jsonify(result)
         except Exception as e:
-            print(f"❌ Error processing file {filename}: {str(e)}")
+            logger.exception(f"❌ Error processing file {filename}: {str(e)}")
             return jsonify({'error': f'File processing error: {str(e)}'}), 500
-        finally:
-            # Clean up temporary file
-            try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                    print(f"✅ Temporary file cleaned up: {filepath}")
-            except Exception as e:
-                print(f"⚠️ Error cleaning up file {filepath}: {str(e)}")
         
     except Exception as e:
-        print(f"❌ Error in upload_file: {str(e)}")
+        logger.exception(f"❌ Error in upload_file: {str(e)}")
         return jsonify({'error': f'Upload error: {str(e)}'}), 500
 
-def process_excel_file_with_timeout(filepath):
+def process_excel_file_with_timeout(source, filename, file_hash=None):
     """Process Excel file with batch processing to handle Heroku timeout limits."""
-    print("\n" + "="*50)
-    print("📊 EXCEL FILE PROCESSING (BATCH-AWARE)")
-    print("="*50)
+    logger.info("=" * 50)
+    logger.info("📊 EXCEL FILE PROCESSING (BATCH-AWARE)")
+    logger.info("=" * 50)
     
     try:
         # Initialize progress tracking
-        app.current_progress = {
+        set_progress({
             'status': 'reading_file',
             'message': 'Reading Excel file...',
             'current_question': 0,
@@ -428,434 +496,442 @@ def process_excel_file_with_timeout(filepath):
             'translation': '',
             'processing_time': '',
             'api_response_time': ''
-        }
+        }, replace=True)
         
         # Read Excel file
-        print(f"📖 Reading Excel file: {filepath}")
-        df = pd.read_excel(filepath, header=None)
-        print(f"✅ Excel file read successfully")
-        print(f"📊 DataFrame shape: {df.shape}")
-        
-        # Extract questions from first column
-        questions = df.iloc[:, 0].dropna().tolist()
-        print(f"📝 Extracted {len(questions)} questions from first column")
+        logger.info(f"📖 Reading Excel file: {filename}")
+        questions, row_numbers = read_questions(source, filename, app.config['MAX_QUESTIONS'] + 1)
+        logger.info(f"✅ Excel file read successfully")
+        logger.info(f"📝 Extracted {len(questions)} questions from first column")
         
         if not questions:
-            print("❌ No questions found in Excel file")
+            logger.error("❌ No questions found in Excel file")
             raise ValueError("No questions found in the Excel file")
         
         if len(questions) > app.config['MAX_QUESTIONS']:
-            print(f"❌ Too many questions: {len(questions)} > {app.config['MAX_QUESTIONS']}")
+            logger.error(f"❌ Too many questions: more than {app.config['MAX_QUESTIONS']}")
             raise ValueError(f"Maximum {app.config['MAX_QUESTIONS']} questions allowed per file")
         
-        print(f"✅ Question count validated: {len(questions)} questions")
+        logger.info(f"✅ Question count validated: {len(questions)} questions")
         
         # Store questions in session for batch processing
-        if not hasattr(app, 'pending_questions'):
-            app.pending_questions = questions
-            app.processed_results = []
-            app.current_batch_start = 0
-        
-        # Get current batch info
-        batch_size = 3  # Process 3 questions per batch
-        total_questions = len(app.pending_questions)
-        current_batch_start = getattr(app, 'current_batch_start', 0)
+        app.pending_questions = questions
+        app.pending_row_numbers = row_numbers
+        app.pending_file_hash = file_hash
+        app.processed_results = []
+        app.processed_count = 0
+        app.error_count = 0
+        app.pending_count = 0
+        app.fallback_count = 0
+        app.current_batch_start = 0
+        
+        return process_next_batch()
         
-        # Calculate batch end
-        batch_end = min(current_batch_start + batch_size, total_questions)
-        current_batch_questions = app.pending_questions[current_batch_start:batch_end]
+    except Exception as e:
+        logger.exception(f"❌ Excel processing error: {str(e)}")
+        # Update progress with error
+        set_progress({
+            'status': 'error',
+            'message': f'Error: {str(e)}',
+            'detected_language': 'Error',
+            'confidence': 0,
+            'translation': f'Processing failed: {str(e)}',
+            'api_response_time': 'Error occurred'
+        })
+        raise Exception(f"Error processing Excel file: {str(e)}")
+
+def upload_file_hash(stream):
+    """Return the SHA-256 hex digest of a seekable stream, rewound afterwards."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(65536), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def upload_cache_key(file_hash):
+    """Return the results cache key for an uploaded file's SHA-256 hash."""
+    return f'upload:{file_hash}'
+
+def read_questions(source, filename, limit):
+    """Read up to ``limit`` questions from the first column of an Excel file.
+    
+    ``source`` is a path or binary file-like object; ``filename`` decides the format.
+    Returns the questions together with the Excel row number of each one.
+    """
+    if CalamineWorkbook is not None:
+        # calamine parses both .xlsx and .xls natively, far faster than openpyxl/xlrd
+        workbook = CalamineWorkbook.from_object(source)
+        try:
+            sheet = workbook.get_sheet_by_index(0)
+            if sheet.start is None or sheet.start[1] > 0:
+                # Rows start at the first used column, so an empty column A is simply absent
+                return [], []
+            rows = sheet.iter_rows()
+            return first_column_questions((row[0] if row else None for row in rows), limit)
+        finally:
+            workbook.close()
+    
+    if not filename.lower().endswith('.xlsx'):
+        # Legacy .xls workbooks are only readable through xlrd; read column A
+        # directly rather than building a whole DataFrame for it
+        if isinstance(source, (str, os.PathLike)):
+            workbook = xlrd.open_workbook(source, on_demand=True)
+        else:
+            workbook = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+        try:
+            sheet = workbook.sheet_by_index(0)
+            values = sheet.col_values(0) if sheet.ncols else []
+            return first_column_questions(values, limit)
+        finally:
+            workbook.release_resources()
+    
+    # Stream column A in read-only mode instead of materializing the whole sheet
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = workbook.worksheets[0].iter_rows(max_col=1, values_only=True)
+        return first_column_questions((value for (value,) in rows), limit)
+    finally:
+        workbook.close()
+
+def first_column_questions(values, limit):
+    """Collect up to ``limit`` non-empty first-column values with their row numbers."""
+    questions = []
+    row_numbers = []
+    for row_number, value in enumerate(values, start=1):
+        if value is None or value == '':
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)  # calamine and xlrd report every number as a float
+        questions.append(value)
+        row_numbers.append(row_number)
+        if len(questions) >= limit:
+            break
+    return questions, row_numbers
+
+def process_next_batch():
+    """Translate the next batch of pending questions and report batch status."""
+    # Get current batch info
+    batch_size = app.config['BATCH_SIZE']
+    total_questions = len(app.pending_questions)
+    current_batch_start = getattr(app, 'current_batch_start', 0)
+    batch_number = current_batch_start // batch_size + 1
+    
+    # Calculate batch end
+    batch_end = min(current_batch_start + batch_size, total_questions)
+    
+    logger.info(f"🔄 Processing batch {batch_number}: questions {current_batch_start + 1}-{batch_end}")
+    logger.info(f"📊 Batch size: {batch_end - current_batch_start} questions")
+    logger.info(f"📊 Total progress: {len(app.processed_results)}/{total_questions} completed")
+    logger.info("=" * 50)
+    
+    # Update progress for batch start
+    set_progress({
+        'status': 'processing_batch',
+        'message': f'Processing batch {batch_number}: questions {current_batch_start + 1}-{batch_end}',
+        'total_questions': total_questions,
+        'current_question': current_batch_start + 1
+    })
+    
+    # Process current batch
+    batch_results = translate_question_range(current_batch_start, batch_end)
+    
+    # Add batch results to processed results, keeping running status counts
+    # so batch reports do not rescan every result so far
+    app.processed_results.extend(batch_results)
+    for result in batch_results:
+        if result.pop('used_fallback', False):
+            app.fallback_count += 1
+        if result['detected_language'] == 'Error':
+            app.error_count += 1
+        elif result['detected_language'] == 'Pending (timeout)':
+            app.pending_count += 1
+        else:
+            app.processed_count += 1
+    
+    # Update batch start for next batch
+    app.current_batch_start = batch_end
+    
+    processed_results = app.processed_results
+    processed_count = app.processed_count
+    
+    # Check if all questions are processed
+    if batch_end >= total_questions:
+        # All questions processed
+        error_count = app.error_count
+        pending_count = app.pending_count
+        fallback_count = app.fallback_count
+        
+        completion_message = f'Processing completed! {processed_count}/{total_questions} questions processed'
+        if pending_count > 0:
+            completion_message += f' ({pending_count} pending due to timeout)'
+        
+        set_progress({
+            'status': 'completed',
+            'message': completion_message,
+            'current_question': total_questions,
+            'detected_language': 'Multiple languages detected',
+            'confidence': 0,
+            'translation': f'{processed_count}/{total_questions} questions translated to English',
+            'processing_time': f'Total: {processed_count} questions processed',
+            'api_response_time': 'Processing completed'
+        })
         
-        print(f"\n🔄 Processing batch {current_batch_start//batch_size + 1}: questions {current_batch_start + 1}-{batch_end}")
-        print(f"📊 Batch size: {len(current_batch_questions)} questions")
-        print(f"📊 Total progress: {len(app.processed_results)}/{total_questions} completed")
-        print("="*50)
+        # Clear session data
+        file_hash = app.pending_file_hash
+        delattr(app, 'pending_questions')
+        delattr(app, 'pending_row_numbers')
+        delattr(app, 'pending_file_hash')
+        delattr(app, 'processed_results')
+        delattr(app, 'processed_count')
+        delattr(app, 'error_count')
+        delattr(app, 'pending_count')
+        delattr(app, 'fallback_count')
+        delattr(app, 'current_batch_start')
+        
+        logger.info("=" * 50)
+        logger.info("✅ ALL BATCHES COMPLETED")
+        logger.info(f"📊 Total questions: {len(processed_results)}")
+        logger.info(f"📊 Successfully processed: {processed_count}")
+        logger.info(f"📊 Errors: {error_count}")
+        logger.info(f"📊 Pending (timeout): {pending_count}")
+        logger.info(f"📊 Unparsed replies (fallback): {fallback_count}")
+        logger.info("=" * 50)
         
-        # Update progress for batch start
-        app.current_progress.update({
-            'status': 'processing_batch',
-            'message': f'Processing batch {current_batch_start//batch_size + 1}: questions {current_batch_start + 1}-{batch_end}',
+        result = {
+            'success': True,
+            'results': processed_results,
             'total_questions': total_questions,
-            'current_question': current_batch_start + 1
+            'processed_at': datetime.now().isoformat(),
+            'batch_complete': True
+        }
+        
+        # Remember fully translated files so a re-upload is answered instantly;
+        # files with fallback guesses are retried on the next upload instead
+        if (file_hash and processed_count == total_questions and fallback_count == 0
+                and not app.config.get('TEST_MODE', False)):
+            cache.set(upload_cache_key(file_hash), result)
+        
+        return result
+    else:
+        # More batches to process
+        batch_completion_message = f'Batch {batch_number} completed! {processed_count}/{total_questions} questions processed so far'
+        
+        set_progress({
+            'status': 'batch_completed',
+            'message': batch_completion_message,
+            'current_question': batch_end,
+            'detected_language': 'Batch completed',
+            'confidence': 0,
+            'translation': f'{processed_count}/{total_questions} questions translated to English',
+            'processing_time': f'Batch {batch_number} completed',
+            'api_response_time': 'Ready for next batch'
         })
         
-        # Process current batch
-        batch_results = []
-        start_time = time.time()
-        
-        for i, question in enumerate(current_batch_questions):
-            # Check if we're approaching Heroku's 30-second timeout (use 25 seconds to be safe)
-            if time.time() - start_time > 25:
-                print(f"⚠️ Approaching Heroku timeout, stopping batch at question {current_batch_start + i + 1}")
-                # Add remaining questions in this batch as pending
-                for j in range(i, len(current_batch_questions)):
-                    global_question_index = current_batch_start + j
-                    row_number = df[df.iloc[:, 0] == app.pending_questions[global_question_index]].index[0] + 1 if len(df[df.iloc[:, 0] == app.pending_questions[global_question_index]]) > 0 else global_question_index + 1
-                    row_number = int(row_number)
-                    
-                    batch_results.append({
-                        'question_number': global_question_index + 1,
-                        'row_number': row_number,
-                        'original_question': app.pending_questions[global_question_index],
-                        'detected_language': 'Pending (timeout)',
-                        'confidence': 0,
-                        'english_translation': 'Processing stopped due to timeout'
-                    })
-                break
-            
-            # Find the actual row number in the Excel file
-            global_question_index = current_batch_start + i
-            row_number = df[df.iloc[:, 0] == question].index[0] + 1 if len(df[df.iloc[:, 0] == question]) > 0 else global_question_index + 1
-            row_number = int(row_number)
-            
-            # Update progress for current question
-            app.current_progress.update({
-                'status': 'processing_question',
-                'message': f'Processing question {global_question_index + 1}/{total_questions} (Row {row_number})',
-                'current_question': global_question_index + 1,
-                'current_row': row_number,
-                'detected_language': 'Analyzing...',
-                'confidence': 0,
-                'translation': 'Waiting for language detection...',
-                'processing_time': f'{global_question_index + 1}/{total_questions} questions processed',
-                'api_response_time': 'Language detection in progress...'
-            })
-            
-            # Force a small delay to ensure progress is updated
-            time.sleep(0.1)
-            
-            print(f"\n--- Question {global_question_index + 1}/{total_questions} (Row {row_number}) ---")
-            print(f"📝 Original: {question[:100]}{'...' if len(question) > 100 else ''}")
-            
-            try:
-                result = process_question(question, global_question_index + 1, row_number)
-                batch_results.append(result)
-                
-                # Update progress with results
-                app.current_progress.update({
-                    'detected_language': result['detected_language'],
-                    'confidence': result['confidence'],
-                    'translation': result['english_translation'][:100] + ('...' if len(result['english_translation']) > 100 else ''),
-                    'api_response_time': 'Translation completed'
-                })
-                
-                # Force a small delay to ensure progress is updated
-                time.sleep(0.1)
-                
-                print(f"✅ Question {global_question_index + 1} (Row {row_number}) processed successfully")
-                print(f"   Language: {result['detected_language']}")
-                print(f"   Confidence: {result['confidence']}%")
-                print(f"   Translation: {result['english_translation'][:50]}{'...' if len(result['english_translation']) > 50 else ''}")
-            except Exception as e:
-                print(f"❌ Error processing question {global_question_index + 1} (Row {row_number}): {str(e)}")
-                # Add error result but continue processing
-                batch_results.append({
-                    'question_number': global_question_index + 1,
-                    'row_number': row_number,
-                    'original_question': question,
-                    'detected_language': 'Error',
-                    'confidence': 0,
-                    'english_translation': f'Processing error: {str(e)}'
-                })
-                
-                # Update progress with error
-                app.current_progress.update({
-                    'detected_language': 'Error',
-                    'confidence': 0,
-                    'translation': f'Processing error: {str(e)}',
-                    'api_response_time': 'Error occurred'
-                })
-        
-        # Add batch results to processed results
-        app.processed_results.extend(batch_results)
-        
-        # Update batch start for next batch
-        app.current_batch_start = batch_end
-        
-        # Check if all questions are processed
-        if batch_end >= total_questions:
-            # All questions processed
-            processed_count = len([r for r in app.processed_results if r['detected_language'] not in ['Error', 'Pending (timeout)']])
-            pending_count = len([r for r in app.processed_results if r['detected_language'] == 'Pending (timeout)'])
-            
-            completion_message = f'Processing completed! {processed_count}/{total_questions} questions processed'
-            if pending_count > 0:
-                completion_message += f' ({pending_count} pending due to timeout)'
-            
-            app.current_progress.update({
-                'status': 'completed',
-                'message': completion_message,
-                'current_question': total_questions,
-                'detected_language': 'Multiple languages detected',
-                'confidence': 0,
-                'translation': f'{processed_count}/{total_questions} questions translated to English',
-                'processing_time': f'Total: {processed_count} questions processed',
-                'api_response_time': 'Processing completed'
-            })
-            
-            # Clear session data
-            delattr(app, 'pending_questions')
-            delattr(app, 'processed_results')
-            delattr(app, 'current_batch_start')
-            
-            print("\n" + "="*50)
-            print("✅ ALL BATCHES COMPLETED")
-            print(f"📊 Total questions: {len(app.processed_results)}")
-            print(f"📊 Successfully processed: {len([r for r in app.processed_results if r['detected_language'] not in ['Error', 'Pending (timeout)']])}")
-            print(f"📊 Errors: {len([r for r in app.processed_results if r['detected_language'] == 'Error'])}")
-            print(f"📊 Pending (timeout): {len([r for r in app.processed_results if r['detected_language'] == 'Pending (timeout)'])}")
-            print("="*50)
-            
-            return {
-                'success': True,
-                'results': app.processed_results,
-                'total_questions': total_questions,
-                'processed_at': datetime.now().isoformat(),
-                'batch_complete': True
-            }
+        logger.info("=" * 50)
+        logger.info(f"✅ BATCH {batch_number} COMPLETED")
+        logger.info(f"📊 Questions processed in this batch: {len(batch_results)}")
+        logger.info(f"📊 Total progress: {len(processed_results)}/{total_questions}")
+        logger.info(f"📊 Next batch: questions {batch_end + 1}-{min(batch_end + batch_size, total_questions)}")
+        logger.info("=" * 50)
+        
+        return {
+            'success': True,
+            'results': processed_results,
+            'total_questions': total_questions,
+            'processed_at': datetime.now().isoformat(),
+            'batch_complete': False,
+            'next_batch_start': batch_end,
+            'remaining_questions': total_questions - batch_end,
+            'batch_message': f'Batch {batch_number} completed. {total_questions - batch_end} questions remaining.'
+        }
+
+def translate_question_range(batch_start, batch_end):
+    """Translate pending questions ``batch_start:batch_end`` concurrently, several per API call."""
+    total_questions = len(app.pending_questions)
+    api_batch_size = app.config['DEEPSEEK_BATCH_SIZE']
+    
+    # Translate each distinct question once and fan the result out to its repeats
+    question_keys = [translation_cache_key(question) for question in app.pending_questions[batch_start:batch_end]]
+    first_index = {}
+    for global_question_index, key in enumerate(question_keys, start=batch_start):
+        first_index.setdefault(key, global_question_index)
+    unique_indices = list(first_index.values())
+    chunks = [
+        unique_indices[chunk_start:chunk_start + api_batch_size]
+        for chunk_start in range(0, len(unique_indices), api_batch_size)
+    ]
+    
+    # Chunks finish out of order, so progress reports a completed count shared
+    # by this batch only; a chunk still running after the timeout keeps
+    # updating its own batch's counter rather than the next batch's
+    completed = CompletedCounter(batch_start)
+    
+    futures = {
+        API_EXECUTOR.submit(translate_chunk, chunk, total_questions, completed): chunk
+        for chunk in chunks
+    }
+    results_by_index = {}
+    try:
+        # Stop waiting before Heroku's 30-second timeout; slow calls become
+        # pending rows instead of failing the whole batch
+        for future in as_completed(futures, timeout=app.config['BATCH_TIMEOUT']):
+            results_by_index.update(zip(futures[future], future.result()))
+    except FuturesTimeoutError:
+        logger.warning(f"⚠️ Approaching Heroku timeout, {len(unique_indices) - len(results_by_index)} questions still pending")
+    finally:
+        # Drop calls that have not started yet so they don't hold up other uploads
+        for future in futures:
+            future.cancel()
+    
+    # Reassemble results in question order
+    batch_results = []
+    for global_question_index, key in enumerate(question_keys, start=batch_start):
+        question = app.pending_questions[global_question_index]
+        row_number = app.pending_row_numbers[global_question_index]
+        result = results_by_index.get(first_index[key])
+        if result is not None:
+            result = same_question_result(result, question)
         else:
-            # More batches to process
-            processed_count = len([r for r in app.processed_results if r['detected_language'] not in ['Error', 'Pending (timeout)']])
-            
-            batch_completion_message = f'Batch {current_batch_start//batch_size + 1} completed! {processed_count}/{total_questions} questions processed so far'
-            
-            app.current_progress.update({
-                'status': 'batch_completed',
-                'message': batch_completion_message,
-                'current_question': batch_end,
-                'detected_language': 'Batch completed',
+            # Add questions that did not finish in time as pending
+            result = {
+                'original_question': question,
+                'detected_language': 'Pending (timeout)',
                 'confidence': 0,
-                'translation': f'{processed_count}/{total_questions} questions translated to English',
-                'processing_time': f'Batch {current_batch_start//batch_size + 1} completed',
-                'api_response_time': 'Ready for next batch'
-            })
-            
-            print("\n" + "="*50)
-            print(f"✅ BATCH {current_batch_start//batch_size + 1} COMPLETED")
-            print(f"📊 Questions processed in this batch: {len(batch_results)}")
-            print(f"📊 Total progress: {len(app.processed_results)}/{total_questions}")
-            print(f"📊 Next batch: questions {batch_end + 1}-{min(batch_end + batch_size, total_questions)}")
-            print("="*50)
-            
-            return {
-                'success': True,
-                'results': app.processed_results,
-                'total_questions': total_questions,
-                'processed_at': datetime.now().isoformat(),
-                'batch_complete': False,
-                'next_batch_start': batch_end,
-                'remaining_questions': total_questions - batch_end,
-                'batch_message': f'Batch {current_batch_start//batch_size + 1} completed. {total_questions - batch_end} questions remaining.'
+                'english_translation': 'Processing stopped due to timeout'
             }
-        
+        # Both branches hand back a fresh dict, so number it in place
+        result['question_number'] = global_question_index + 1
+        result['row_number'] = row_number
+        batch_results.append(result)
+    
+    return batch_results
+
+def translate_chunk(question_indices, total_questions, completed):
+    """Translate the pending questions at ``question_indices`` with one API call.
+    
+    ``completed`` is the batch's CompletedCounter, used for progress reports.
+    """
+    items = [
+        (global_question_index + 1, app.pending_row_numbers[global_question_index], app.pending_questions[global_question_index])
+        for global_question_index in question_indices
+    ]
+    first_question, last_question = items[0][0], items[-1][0]
+    row_number = items[0][1]
+    
+    # Progress is published only at chunk boundaries; the API helpers
+    # below do not report their own intermediate states
+    set_progress({
+        'status': 'processing_question',
+        'message': f'Processing questions {first_question}-{last_question}/{total_questions} (Row {row_number})',
+        'current_row': row_number,
+        'detected_language': 'Analyzing...',
+        'confidence': 0,
+        'translation': 'Waiting for language detection...',
+        'api_response_time': 'Language detection in progress...'
+    })
+    
+    logger.debug("--- Questions %s-%s/%s (Row %s) ---", first_question, last_question, total_questions, row_number)
+    
+    try:
+        chunk_results = process_question_batch(items)
     except Exception as e:
-        print(f"❌ Excel processing error: {str(e)}")
-        # Update progress with error
-        app.current_progress.update({
-            'status': 'error',
-            'message': f'Error: {str(e)}',
+        logger.exception(f"❌ Error processing questions {first_question}-{last_question}: {str(e)}")
+        # Add error results but continue processing
+        chunk_results = [{
+            'question_number': question_number,
+            'row_number': question_row,
+            'original_question': question,
             'detected_language': 'Error',
             'confidence': 0,
-            'translation': f'Processing failed: {str(e)}',
-            'api_response_time': 'Error occurred'
-        })
-        raise Exception(f"Error processing Excel file: {str(e)}")
+            'english_translation': f'Processing error: {str(e)}'
+        } for question_number, question_row, question in items]
+    
+    for result in chunk_results:
+        logger.debug("✅ Question %s (Row %s) processed", result['question_number'], result.get('row_number'))
+        logger.debug("   Language: %s", result['detected_language'])
+        logger.debug("   Confidence: %s%%", result['confidence'])
+        logger.debug("   Translation: %.50s", result['english_translation'])
+    
+    # Update progress with results
+    completed_questions = completed.add(len(chunk_results))
+    last_result = chunk_results[-1]
+    set_progress({
+        'current_question': completed_questions,
+        'processing_time': f'{completed_questions}/{total_questions} questions processed',
+        'detected_language': last_result['detected_language'],
+        'confidence': last_result['confidence'],
+        'translation': last_result['english_translation'][:100] + ('...' if len(last_result['english_translation']) > 100 else ''),
+        'api_response_time': 'Translation completed'
+    })
+    
+    return chunk_results
 
 def process_question(question, question_number, row_number=None):
-    """Process a single question using DeepSeek API."""
+    """Process a single question using a single DeepSeek API call."""
     row_info = f" (Row {row_number})" if row_number else ""
-    print(f"  🔍 Processing question {question_number}{row_info}...")
+    logger.debug("  🔍 Processing question %s%s...", question_number, row_info)
     
     try:
         # Test mode - return mock results
         if app.config.get('TEST_MODE', False):
-            print(f"  🧪 TEST MODE: Returning mock results")
-            return {
+            logger.debug("  🧪 TEST MODE: Returning mock results")
+            result = {
                 'question_number': question_number,
                 'original_question': question,
                 'detected_language': 'English',
                 'confidence': 95,
                 'english_translation': f'[TEST MODE] {question}'
             }
-        
-        # Check if API key is configured
-        if not app.config.get('DEEPSEEK_API_KEY'):
-            print(f"  ❌ DeepSeek API key not configured")
-            raise Exception("DeepSeek API key not configured")
-        
-        print(f"  ✅ API key configured: {app.config['DEEPSEEK_API_KEY'][:10]}...")
-        
-        # Prepare API request for language detection and translation
-        headers = {
-            'Authorization': f'Bearer {app.config["DEEPSEEK_API_KEY"]}',
-            'Content-Type': 'application/json'
-        }
-        
-        # First, detect language
-        language_prompt = f"""
-        Analyze the following text and provide the detected language and confidence score.
-        
-        Text: "{question}"
-        
-        Respond with ONLY a valid JSON object in this exact format (no markdown, no code blocks):
-        {{
-            "language": "detected_language_name",
-            "confidence": confidence_score
-        }}
-        """
-        
-        language_data = {
-            'model': 'deepseek-chat',
-            'messages': [{'role': 'user', 'content': language_prompt}],
-            'temperature': 0.1
-        }
-        
+            if row_number:
+                result['row_number'] = row_number
+            return result
+        
+        # Codes and punctuation are passed through without an API call
+        untranslatable = untranslatable_result(question, question_number, row_number)
+        if untranslatable:
+            logger.debug("  ⏭️  Nothing to translate, passing through")
+            return untranslatable
+        
+        # Serve repeated questions from the translation cache
+        cached = get_cached_translation(question, question_number, row_number)
+        if cached:
+            logger.debug("  ♻️  Translation cache hit")
+            return cached
+        
+        # Detect language and translate in one round-trip
+        request_body = deepseek_request_body(QUESTION_SYSTEM_PROMPT, str(question), QUESTION_MAX_TOKENS)
+        logger.debug("  🌐 Making language detection + translation API call...")
+        api_result = deepseek_post(request_body, timeout=10)  # Further reduced timeout for Heroku
+        
+        # Handle potential JSON parsing issues in API response
+        content = ''
         try:
-            print(f"  🌐 Making language detection API call...")
-            print(f"  📡 URL: {app.config['DEEPSEEK_API_URL']}")
-            print(f"  ⏱️  Timeout: 15 seconds")
+            logger.debug("  🔍 Parsing API response...")
+            content = api_result['choices'][0]['message']['content']
+            logger.debug("  📝 Raw API response: %s", content)
             
-            # Update progress for language detection
-            if hasattr(app, 'current_progress'):
-                app.current_progress.update({
-                    'detected_language': 'Detecting language...',
-                    'confidence': 0,
-                    'api_response_time': 'Language detection API call in progress...'
-                })
+            content = clean_json_content(content)
+            language_info = orjson.loads(content)
+            logger.debug("  ✅ JSON parsed successfully: %s", language_info)
             
-            start_time = datetime.now()
-            language_response = requests.post(
-                app.config['DEEPSEEK_API_URL'],
-                headers=headers,
-                json=language_data,
-                timeout=10  # Further reduced timeout for Heroku
-            )
-            end_time = datetime.now()
-            api_time = (end_time - start_time).total_seconds()
+            # Ensure confidence is an integer percentage (0-100)
+            if 'confidence' in language_info:
+                language_info['confidence'] = confidence_percentage(language_info['confidence'])
+                logger.debug("  📊 Confidence converted to percentage: %s%%", language_info['confidence'])
             
-            print(f"  ⏱️  API call completed in {api_time:.2f} seconds")
-            print(f"  📊 Response status: {language_response.status_code}")
-            
-            if language_response.status_code != 200:
-                print(f"  ❌ API Error: {language_response.status_code} - {language_response.text}")
-                raise Exception(f"Language detection API error: {language_response.status_code} - {language_response.text}")
-            
-            print(f"  ✅ API call successful")
-            language_result = language_response.json()
-            
-            # Handle potential JSON parsing issues in API response
-            try:
-                print(f"  🔍 Parsing language detection response...")
-                language_content = language_result['choices'][0]['message']['content']
-                print(f"  📝 Raw API response: {language_content}")
-                
-                # Clean up the response - remove markdown code blocks if present
-                if language_content.startswith('```json'):
-                    language_content = language_content.replace('```json', '').replace('```', '').strip()
-                    print(f"  🧹 Cleaned JSON response: {language_content}")
-                elif language_content.startswith('```'):
-                    language_content = language_content.replace('```', '').strip()
-                    print(f"  🧹 Cleaned response: {language_content}")
-                
-                language_info = json.loads(language_content)
-                print(f"  ✅ JSON parsed successfully: {language_info}")
-                
-                # Ensure confidence is an integer percentage (0-100)
-                if 'confidence' in language_info:
-                    confidence_value = language_info['confidence']
-                    # Handle both decimal (0.95) and percentage (95) formats
-                    if isinstance(confidence_value, float) and confidence_value <= 1.0:
-                        # Convert decimal to percentage (0.95 -> 95)
-                        language_info['confidence'] = int(confidence_value * 100)
-                    else:
-                        # Already a percentage, just convert to int
-                        language_info['confidence'] = int(confidence_value)
-                    print(f"  📊 Confidence converted to percentage: {language_info['confidence']}%")
-                
-                # Update progress with detected language and confidence
-                if hasattr(app, 'current_progress'):
-                    app.current_progress.update({
-                        'detected_language': language_info.get('language', 'Unknown'),
-                        'confidence': language_info.get('confidence', 0),
-                        'api_response_time': 'Language detection completed'
-                    })
-                    
-            except (KeyError, json.JSONDecodeError) as e:
-                # Fallback: assume English if parsing fails
-                print(f"  ❌ JSON parsing error: {e}")
-                print(f"  📝 Raw content: {language_content}")
-                language_info = {"language": "English", "confidence": 90}
-                print(f"  🔄 Using fallback: {language_info}")
-                
-                # Update progress with fallback values
-                if hasattr(app, 'current_progress'):
-                    app.current_progress.update({
-                        'detected_language': language_info['language'],
-                        'confidence': language_info['confidence'],
-                        'api_response_time': 'Language detection completed (fallback)'
-                    })
-                
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Network error during language detection: {str(e)}")
-        
-        # Then, translate to English
-        translation_prompt = f"""
-        Translate the following text to English. Maintain the original meaning and tone.
-        If the text is already in English, return it unchanged.
-        Preserve any HTML tags like <i>, <em>, <strong>, etc.
-        
-        Text: "{question}"
-        
-        Provide only the English translation, nothing else.
-        """
-        
-        translation_data = {
-            'model': 'deepseek-chat',
-            'messages': [{'role': 'user', 'content': translation_prompt}],
-            'temperature': 0.1
-        }
-        
-        try:
-            print(f"  🌐 Making translation API call...")
-            print(f"  ⏱️  Timeout: 15 seconds")
-            
-            # Update progress for translation
-            if hasattr(app, 'current_progress'):
-                app.current_progress.update({
-                    'translation': 'Translating to English...',
-                    'api_response_time': 'Translation API call in progress...'
-                })
-            
-            start_time = datetime.now()
-            translation_response = requests.post(
-                app.config['DEEPSEEK_API_URL'],
-                headers=headers,
-                json=translation_data,
-                timeout=10  # Further reduced timeout for Heroku
-            )
-            end_time = datetime.now()
-            api_time = (end_time - start_time).total_seconds()
-            
-            print(f"  ⏱️  Translation API call completed in {api_time:.2f} seconds")
-            print(f"  📊 Response status: {translation_response.status_code}")
-            
-            if translation_response.status_code != 200:
-                print(f"  ❌ Translation API Error: {translation_response.status_code} - {translation_response.text}")
-                raise Exception(f"Translation API error: {translation_response.status_code} - {translation_response.text}")
-            
-            print(f"  ✅ Translation API call successful")
-            translation_result = translation_response.json()
-            english_translation = translation_result['choices'][0]['message']['content'].strip()
-            print(f"  📝 Translation result: {english_translation[:50]}{'...' if len(english_translation) > 50 else ''}")
-            
-            # Update progress with translation result
-            if hasattr(app, 'current_progress'):
-                app.current_progress.update({
-                    'translation': english_translation[:100] + ('...' if len(english_translation) > 100 else ''),
-                    'api_response_time': 'Translation completed'
-                })
-            
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Network error during translation: {str(e)}")
+            english_translation = reply_translation(language_info, question)
+            used_fallback = False
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            # Fallback: assume English, keep the original text, if parsing fails
+            # (orjson.JSONDecodeError is a ValueError subclass)
+            logger.warning("  ❌ JSON parsing error: %s", e)
+            logger.warning("  📝 Raw content: %s", content)
+            language_info = {"language": "English", "confidence": 90, "english_translation": question}
+            logger.warning("  🔄 Using fallback: %s", language_info)
+            english_translation = str(question).strip()
+            used_fallback = True
+        
+        logger.debug("  📝 Translation result: %.50s", english_translation)
         
         result = {
             'question_number': question_number,
@@ -867,12 +943,18 @@ def process_question(question, question_number, row_number=None):
         
         if row_number:
             result['row_number'] = row_number
-            
+        
+        # A fallback guess must not be reused for later copies of the question,
+        # and is flagged so the upload result is not cached either
+        if used_fallback:
+            result['used_fallback'] = True
+        else:
+            cache_translation(result)
         return result
         
     except Exception as e:
         row_info = f" (Row {row_number})" if row_number else ""
-        print(f"Error processing question {question_number}{row_info}: {str(e)}")
+        logger.exception(f"Error processing question {question_number}{row_info}: {str(e)}")
         result = {
             'question_number': question_number,
             'original_question': question,
@@ -886,6 +968,245 @@ def process_question(question, question_number, row_number=None):
             
         return result
 
+def process_question_batch(items):
+    """Process several questions using a single DeepSeek API call.
+    
+    ``items`` is a list of ``(question_number, row_number, question)`` tuples.
+    Questions missing from the batched reply are retried one at a time; if the
+    call itself fails, every question in it gets an error result instead.
+    """
+    # Nothing to batch in test mode
+    if app.config.get('TEST_MODE', False):
+        return [process_question(question, question_number, row_number) for question_number, row_number, question in items]
+    
+    # Pass through codes and serve repeated questions from the translation cache
+    results = {}
+    for question_number, row_number, question in items:
+        local = (
+            untranslatable_result(question, question_number, row_number)
+            or get_cached_translation(question, question_number, row_number)
+        )
+        if local:
+            results[question_number] = local
+    uncached_items = [item for item in items if item[0] not in results]
+    if results:
+        logger.debug("  ♻️  %s/%s questions served without an API call", len(results), len(items))
+    
+    # Nothing to batch for a single question
+    if len(uncached_items) <= 1:
+        for question_number, row_number, question in uncached_items:
+            results[question_number] = process_question(question, question_number, row_number)
+        return [results[question_number] for question_number, _, _ in items]
+    
+    logger.debug("  🔍 Processing questions %s-%s in a single API call...", uncached_items[0][0], uncached_items[-1][0])
+    
+    batch_info = {}
+    try:
+        numbered_texts = "\n".join(
+            f"{n}. {orjson.dumps(question).decode()}"
+            for n, (_, _, question) in enumerate(uncached_items, start=1)
+        )
+        request_body = deepseek_request_body(
+            BATCH_SYSTEM_PROMPT,
+            numbered_texts,
+            QUESTION_MAX_TOKENS * len(uncached_items)
+        )
+        
+        logger.debug("  🌐 Making batch API call for %s questions...", len(uncached_items))
+        api_result = deepseek_post(request_body, timeout=20)  # Batched replies are longer; capped to the batch budget
+        
+        content = clean_json_content(api_result['choices'][0]['message']['content'])
+        for entry in orjson.loads(content).get('results', []):
+            try:
+                batch_info[int(entry['n'])] = entry
+            except (KeyError, TypeError, ValueError):
+                continue
+        logger.debug("  ✅ Batch response parsed: %s/%s results", len(batch_info), len(uncached_items))
+        
+    except Exception as e:
+        # Retrying each item would only multiply calls to an API that is
+        # already failing or rate-limiting us
+        logger.exception(f"  ❌ Batch API call failed: {str(e)}")
+        for question_number, row_number, question in uncached_items:
+            result = {
+                'question_number': question_number,
+                'original_question': question,
+                'detected_language': 'Error',
+                'confidence': 0,
+                'english_translation': f'Translation error: {str(e)}'
+            }
+            if row_number:
+                result['row_number'] = row_number
+            results[question_number] = result
+        return [results[question_number] for question_number, _, _ in items]
+    
+    for n, (question_number, row_number, question) in enumerate(uncached_items, start=1):
+        entry = batch_info.get(n)
+        try:
+            if not entry:
+                raise ValueError("missing from batch response")
+            english_translation = reply_translation(entry, question)
+            result = {
+                'question_number': question_number,
+                'original_question': question,
+                'detected_language': entry.get('language', 'Unknown'),
+                'confidence': confidence_percentage(entry.get('confidence', 0)),
+                'english_translation': english_translation
+            }
+        except (TypeError, ValueError):
+            # Retry the failed item on its own
+            logger.debug("  🔄 Retrying question %s individually", question_number)
+            results[question_number] = process_question(question, question_number, row_number)
+            continue
+        
+        if row_number:
+            result['row_number'] = row_number
+        
+        cache_translation(result)
+        results[question_number] = result
+    
+    return [results[question_number] for question_number, _, _ in items]
+
+def reply_translation(info, question):
+    """Return the English translation from a parsed reply for ``question``.
+    
+    English texts come back without a translation to save output tokens, so
+    they pass through; a missing translation for any other language raises
+    ValueError.
+    """
+    english_translation = str(info.get('english_translation') or '').strip()
+    if english_translation:
+        return english_translation
+    if not str(info.get('language', '')).lower().startswith('english'):
+        raise ValueError("translation missing from reply")
+    return str(question).strip()
+
+def untranslatable_result(question, question_number, row_number=None):
+    """Return a pass-through result if a question has no text to translate, else None."""
+    if not UNTRANSLATABLE_PATTERN.fullmatch(str(question)):
+        return None
+    result = {
+        'question_number': question_number,
+        'original_question': question,
+        'detected_language': 'N/A',
+        'confidence': 100,
+        'english_translation': str(question).strip()
+    }
+    if row_number:
+        result['row_number'] = row_number
+    return result
+
+def translation_cache_key(question):
+    """Return the translation cache key for a question.
+    
+    Surrounding and repeated whitespace is ignored, so reformatted copies of the
+    same item share one translation; case is kept since it can change meaning.
+    """
+    normalized = ' '.join(str(question).split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+def same_question_result(result, question):
+    """Return a copy of a translation result for another spelling of its question."""
+    same_result = dict(result, original_question=question)
+    if result['english_translation'] == str(result['original_question']).strip():
+        # English text was passed through untranslated, so pass this spelling through too
+        same_result['english_translation'] = str(question).strip()
+    return same_result
+
+def get_cached_translation(question, question_number, row_number=None):
+    """Return a cached result for a question, renumbered for its new position."""
+    key = translation_cache_key(question)
+    with TRANSLATION_CACHE_LOCK:
+        cached = TRANSLATION_CACHE.get(key)
+        if cached is None:
+            return None
+        TRANSLATION_CACHE.move_to_end(key)
+    
+    result = same_question_result(cached, question)
+    result['question_number'] = question_number
+    if row_number:
+        result['row_number'] = row_number
+    else:
+        result.pop('row_number', None)
+    return result
+
+def cache_translation(result):
+    """Store a successful translation result in the cache."""
+    key = translation_cache_key(result['original_question'])
+    with TRANSLATION_CACHE_LOCK:
+        TRANSLATION_CACHE[key] = dict(result)
+        TRANSLATION_CACHE.move_to_end(key)
+        while len(TRANSLATION_CACHE) > TRANSLATION_CACHE_SIZE:
+            TRANSLATION_CACHE.popitem(last=False)
+
+def deepseek_request_body(instructions, text, max_tokens):
+    """Serialize a JSON-mode DeepSeek chat completion request for ``text``."""
+    return orjson.dumps({
+        'model': 'deepseek-chat',
+        'messages': [
+            {'role': 'system', 'content': instructions},
+            {'role': 'user', 'content': text}
+        ],
+        'temperature': 0,  # Deterministic output
+        'max_tokens': max_tokens,  # Generation time grows with output length
+        'response_format': {'type': 'json_object'}
+    })
+
+def deepseek_post(request_body, timeout):
+    """POST a serialized request to DeepSeek and return the decoded JSON reply.
+    
+    ``timeout`` is the read timeout in seconds. It is capped so that every
+    attempt allowed by DEEPSEEK_RETRY fits inside BATCH_TIMEOUT. Raises an
+    exception if the API key is missing, the request fails on the network, or
+    DeepSeek answers with a non-200 status.
+    """
+    if not app.config.get('DEEPSEEK_API_KEY'):
+        logger.error("  ❌ DeepSeek API key not configured")
+        raise Exception("DeepSeek API key not configured")
+    
+    # Content-Type is set once on the shared session
+    headers = {
+        'Authorization': f'Bearer {app.config["DEEPSEEK_API_KEY"]}'
+    }
+    
+    attempts = DEEPSEEK_RETRY.total + 1
+    read_timeout = max(1, min(timeout, app.config['BATCH_TIMEOUT'] / attempts - DEEPSEEK_CONNECT_TIMEOUT))
+    
+    try:
+        start_time = time.perf_counter()
+        response = SESSION.post(
+            app.config['DEEPSEEK_API_URL'],
+            headers=headers,
+            data=request_body,
+            timeout=(DEEPSEEK_CONNECT_TIMEOUT, read_timeout)
+        )
+        api_time = time.perf_counter() - start_time
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Network error calling DeepSeek: {str(e)}")
+    
+    logger.debug("  ⏱️  API call completed in %.2f seconds", api_time)
+    logger.debug("  📊 Response status: %s", response.status_code)
+    
+    if response.status_code != 200:
+        logger.error(f"  ❌ API Error: {response.status_code} - {response.text}")
+        raise Exception(f"DeepSeek API error: {response.status_code} - {response.text}")
+    
+    return orjson.loads(response.content)
+
+def clean_json_content(content):
+    """Extract the JSON object from a model reply, dropping code fences and stray prose."""
+    match = JSON_BLOCK_PATTERN.search(content)
+    return match.group(0) if match else content.strip()
+
+def confidence_percentage(confidence_value):
+    """Convert a confidence score to an integer percentage (0-100)."""
+    # Handle both decimal (0.95) and percentage (95) formats
+    if isinstance(confidence_value, float) and confidence_value <= 1.0:
+        # Convert decimal to percentage (0.95 -> 95)
+        return int(confidence_value * 100)
+    # Already a percentage, just convert to int
+    return int(confidence_value)
+
 @app.route('/download', methods=['POST'])
 def download_results():
     """Generate and download Excel file with results."""
@@ -896,29 +1217,33 @@ def download_results():
         if not results:
             return jsonify({'error': 'No results to download'}), 400
         
-        # Create DataFrame for Excel export
-        df = pd.DataFrame(results)
-        df = df[['original_question', 'detected_language', 'confidence', 'english_translation']]
-        df.columns = ['Original Question', 'Detected Language', 'Confidence (%)', 'English Translation']
+        # Write to Excel in memory; in_memory keeps XlsxWriter from staging the
+        # workbook parts in temp files, which is fine for at most MAX_QUESTIONS
+        # rows. Survey text is always written literally, never as formulas or links
+        buffer = io.BytesIO()
+        workbook = xlsxwriter.Workbook(buffer, {
+            'in_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False
+        })
+        worksheet = workbook.add_worksheet('Translation Results')
         
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-        temp_file.close()
+        # Header row, with the timestamp label in column F
+        worksheet.write_row(0, 0, ['Original Question', 'Detected Language', 'Confidence (%)', 'English Translation', None, 'Processed At'])
         
-        # Write to Excel
-        with pd.ExcelWriter(temp_file.name, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Translation Results', index=False)
-            
-            # Get the workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['Translation Results']
-            
-            # Add timestamp
-            worksheet['F1'] = 'Processed At'
-            worksheet['F2'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        processed_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for row_index, result in enumerate(results, start=1):
+            row = [result['original_question'], result['detected_language'], result['confidence'], result['english_translation']]
+            if row_index == 1:
+                # Add timestamp below its label (rows are written strictly in order)
+                row += [None, processed_at]
+            worksheet.write_row(row_index, 0, row)
+        
+        workbook.close()
+        buffer.seek(0)
         
         return send_file(
-            temp_file.name,
+            buffer,
             as_attachment=True,
             download_name=f'survey_translation_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the Survey Question Translator MVP.
+
+Loaded automatically by ``gunicorn app:app`` (see Procfile) from the project root.
+"""
+
+import multiprocessing
+import os
+
+# Heroku provides the port to listen on
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Batch state (pending questions, progress) lives in process memory, so
+# follow-up /auto-continue-batch and /progress requests must reach the worker
+# that handled /upload. Keep a single worker by default and serve concurrent
+# requests with threads; raise WEB_CONCURRENCY only once that state is shared.
+# For the same reason max_requests is left unset: recycling the worker would
+# drop any in-flight job.
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 2 * multiprocessing.cpu_count() + 1))
+
+# Heroku's router times out requests after 30 seconds
+timeout = 30
+keepalive = 5
@@ -5,12 +5,26 @@ This module contains unit tests for the main application functionality.
 """
 
 import pytest
+import json
 import tempfile
 import os
+import io
+import threading
 import pandas as pd
+from collections import OrderedDict, deque
 from app import create_app
 
 
+class FakeDeepSeekResponse:
+    """Minimal stand-in for a successful DeepSeek chat completion response."""
+
+    text = ''
+
+    def __init__(self, content, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps({'choices': [{'message': {'content': content}}]}).encode()
+
+
 @pytest.fixture
 def app():
     """Create and configure a new app instance for each test."""
@@ -20,6 +34,39 @@ def app():
     return app
 
 
+@pytest.fixture
+def deepseek(monkeypatch):
+    """Serve DeepSeek calls from canned replies, outside test mode.
+
+    Call the fixture with the replies in order, as message contents or whole
+    FakeDeepSeekResponse objects; the last one is reused for any further calls,
+    and no replies means DeepSeek must not be called.
+    Returns the list of decoded request bodies.
+    """
+    import app as app_module
+
+    def setup(*replies):
+        calls = []
+        remaining = list(replies)
+
+        def fake_post(url, **kwargs):
+            calls.append(json.loads(kwargs['data']))
+            if not remaining:
+                raise AssertionError('DeepSeek should not be called')
+            reply = remaining.pop(0) if len(remaining) > 1 else remaining[0]
+            if isinstance(reply, FakeDeepSeekResponse):
+                return reply
+            return FakeDeepSeekResponse(reply)
+
+        monkeypatch.setitem(app_module.app.config, 'TEST_MODE', False)
+        monkeypatch.setitem(app_module.app.config, 'DEEPSEEK_API_KEY', 'test-key')
+        monkeypatch.setattr(app_module.SESSION, 'post', fake_post)
+        monkeypatch.setattr(app_module, 'TRANSLATION_CACHE', OrderedDict())
+        return calls
+
+    return setup
+
+
 @pytest.fixture
 def client(app):
     """Create a test client for the Flask application."""
@@ -126,5 +173,265 @@ def test_excel_file_creation():
     os.unlink(file_path)
 
 
+def test_read_questions_keeps_row_numbers():
+    """Test that blank rows are skipped but questions keep their Excel row."""
+    from app import read_questions
+
+    df = pd.DataFrame([['First question'], [None], ['Second question'], ['Third question']])
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as f:
+        df.to_excel(f.name, index=False, header=False)
+
+    questions, row_numbers = read_questions(f.name, 'questions.xlsx', 2)
+    os.unlink(f.name)
+
+    assert questions == ['First question', 'Second question']
+    assert row_numbers == [1, 3]
+
+
+def test_process_question_single_api_call(deepseek):
+    """Test that language detection and translation share one API call."""
+    import app as app_module
+
+    calls = deepseek(
+        '{"language": "Spanish", "confidence": 0.95, '
+        '"english_translation": "What is your age?"}'
+    )
+
+    result = app_module.process_question('¿Cuál es tu edad?', 1, 2)
+
+    assert len(calls) == 1
+    assert calls[0]['response_format'] == {'type': 'json_object'}
+    assert calls[0]['temperature'] == 0
+    assert calls[0]['messages'][0] == {'role': 'system', 'content': app_module.QUESTION_SYSTEM_PROMPT}
+    assert calls[0]['messages'][1] == {'role': 'user', 'content': '¿Cuál es tu edad?'}
+    assert result['detected_language'] == 'Spanish'
+    assert result['confidence'] == 95
+    assert result['english_translation'] == 'What is your age?'
+    assert result['row_number'] == 2
+
+
+def test_missing_translation_for_other_language_is_not_cached(deepseek):
+    """Test that a non-English reply without a translation is treated as a fallback."""
+    import app as app_module
+
+    deepseek('{"language": "Spanish", "confidence": 95, "english_translation": null}')
+
+    result = app_module.process_question('¿Cuál es tu edad?', 1, 2)
+
+    assert result['used_fallback'] is True
+    assert len(app_module.TRANSLATION_CACHE) == 0
+
+def test_process_question_batch_retries_missing_items(deepseek):
+    """Test that questions missing from a batched reply are retried one by one."""
+    import app as app_module
+
+    calls = deepseek(
+        '{"results": [{"n": 1, "language": "Spanish", "confidence": 95, '
+        '"english_translation": "What is your age?"}, '
+        '{"n": 3, "language": "English", "confidence": 99, '
+        '"english_translation": null}]}',
+        '{"language": "French", "confidence": 90, '
+        '"english_translation": "Where do you live?"}'
+    )
+
+    results = app_module.process_question_batch([
+        (1, 2, '¿Cuál es tu edad?'),
+        (2, 3, 'Où habitez-vous ?'),
+        (3, 4, 'How old are you?'),
+    ])
+
+    assert len(calls) == 2
+    assert [r['question_number'] for r in results] == [1, 2, 3]
+    assert [r['row_number'] for r in results] == [2, 3, 4]
+    assert results[0]['english_translation'] == 'What is your age?'
+    assert results[1]['detected_language'] == 'French'
+    assert results[2]['english_translation'] == 'How old are you?'
+
+
+def test_failed_batch_call_is_not_retried_per_question(deepseek):
+    """Test that a failed batched call gives error rows instead of one call per question."""
+    import app as app_module
+
+    calls = deepseek(FakeDeepSeekResponse('', status_code=503))
+
+    results = app_module.process_question_batch([
+        (1, 2, '¿Cuál es tu edad?'),
+        (2, 3, 'Où habitez-vous ?'),
+    ])
+
+    assert len(calls) == 1
+    assert [r['detected_language'] for r in results] == ['Error', 'Error']
+    assert [r['row_number'] for r in results] == [2, 3]
+
+
+def test_repeated_question_served_from_cache(deepseek):
+    """Test that a repeated question does not trigger a second API call."""
+    import app as app_module
+
+    calls = deepseek(
+        '{"language": "German", "confidence": 98, '
+        '"english_translation": "How old are you?"}'
+    )
+
+    first = app_module.process_question('Wie alt sind Sie?', 1, 2)
+    second = app_module.process_question('Wie alt sind Sie?', 7, 9)
+    reformatted = app_module.process_question(' Wie alt  sind Sie? ', 8, 10)
+
+    assert len(calls) == 1
+    assert second['english_translation'] == first['english_translation']
+    assert second['question_number'] == 7
+    assert second['row_number'] == 9
+    assert reformatted['original_question'] == ' Wie alt  sind Sie? '
+    assert reformatted['english_translation'] == first['english_translation']
+
+
+def test_upload_and_auto_continue_in_test_mode(monkeypatch):
+    """Test that an upload is processed in batches until all questions are done."""
+    import app as app_module
+
+    monkeypatch.setitem(app_module.app.config, 'TEST_MODE', True)
+    monkeypatch.setitem(app_module.app.config, 'BATCH_SIZE', 3)
+    client = app_module.app.test_client()
+
+    df = pd.DataFrame([[f'Question {i}'] for i in range(1, 6)])
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as f:
+        df.to_excel(f.name, index=False, header=False)
+
+    with open(f.name, 'rb') as file:
+        response = client.post('/upload', data={'file': (file, 'questions.xlsx')})
+    os.unlink(f.name)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['batch_complete'] is False
+    assert data['remaining_questions'] == 2
+
+    response = client.post('/auto-continue-batch')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['batch_complete'] is True
+    assert [r['row_number'] for r in data['results']] == [1, 2, 3, 4, 5]
+    assert data['results'][4]['english_translation'] == '[TEST MODE] Question 5'
+
+
+def test_progress_stream_replays_from_last_event_id(monkeypatch):
+    """Test that /progress replays missed events and ends on completion."""
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'PROGRESS_EVENTS', deque(maxlen=256))
+    monkeypatch.setattr(app_module.app, 'progress_version', 0)
+    monkeypatch.setattr(app_module.app, 'current_progress', {}, raising=False)
+    monkeypatch.setattr(app_module, 'SSE_HEARTBEAT_INTERVAL', 0.05)
+    client = app_module.app.test_client()
+
+    def stream(**headers):
+        frames = client.get('/progress', headers=headers).data.split(b'\n\n')
+        ids = [int(frame.split(b'\n')[0][4:]) for frame in frames if frame.startswith(b'id: ')]
+        statuses = [json.loads(frame.split(b'data: ')[1])['status'] for frame in frames if frame.startswith(b'id: ')]
+        return frames, ids, statuses
+
+    app_module.set_progress({'status': 'reading_file', 'message': 'Reading Excel file...'}, replace=True)
+    app_module.set_progress({'status': 'processing', 'total_questions': 2})
+    app_module.set_progress({'status': 'processing'})  # Unchanged, not republished
+    app_module.set_progress({'status': 'completed'})
+
+    # Reconnecting clients replay what they missed; fresh, invalid and
+    # future ids start from the latest event
+    assert stream(**{'Last-Event-ID': '1'})[1:] == ([2, 3], ['processing', 'completed'])
+    assert stream()[1:] == ([3], ['completed'])
+    assert stream(**{'Last-Event-ID': 'abc'})[1:] == ([3], ['completed'])
+    assert stream(**{'Last-Event-ID': '99'})[1:] == ([3], ['completed'])
+
+    # An idle stream sends keep-alive comments until the next event
+    app_module.set_progress({'status': 'processing_batch'})
+    threading.Timer(0.3, app_module.set_progress, [{'status': 'completed'}]).start()
+    frames, ids, statuses = stream(**{'Last-Event-ID': '4'})
+    assert b': keep-alive' in frames
+    assert (ids, statuses) == ([5], ['completed'])
+
+def test_download_results_excel():
+    """Test that results are exported as an Excel workbook."""
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/download', json={'results': [{
+        'question_number': 1,
+        'original_question': '¿Cuál es tu edad?',
+        'detected_language': 'Spanish',
+        'confidence': 95,
+        'english_translation': 'What is your age?'
+    }]})
+
+    assert response.status_code == 200
+    df = pd.read_excel(io.BytesIO(response.data))
+    assert df.iloc[0]['English Translation'] == 'What is your age?'
+    assert df.iloc[0]['Confidence (%)'] == 95
+
+
+def test_fallback_results_are_not_cached_for_reupload(deepseek, monkeypatch):
+    """Test that an upload with unparseable replies is not stored in the upload cache."""
+    import app as app_module
+
+    cached = []
+    deepseek('not json')
+    monkeypatch.setattr(app_module.cache, 'get', lambda key: None)
+    monkeypatch.setattr(app_module.cache, 'set', lambda key, value: cached.append(key))
+    client = app_module.app.test_client()
+
+    df = pd.DataFrame([['¿Cuál es tu edad?']])
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as f:
+        df.to_excel(f.name, index=False, header=False)
+
+    with open(f.name, 'rb') as file:
+        response = client.post('/upload', data={'file': (file, 'questions.xlsx')})
+    os.unlink(f.name)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['batch_complete'] is True
+    assert data['results'][0]['detected_language'] == 'English'
+    assert 'used_fallback' not in data['results'][0]
+    assert cached == []
+
+
+def test_reupload_is_served_from_upload_cache(deepseek, monkeypatch):
+    """Test that uploading the same file again returns the cached result without API calls."""
+    import app as app_module
+    from flask_caching import Cache
+
+    calls = deepseek(
+        '{"language": "Spanish", "confidence": 95, '
+        '"english_translation": "What is your age?"}'
+    )
+    monkeypatch.setattr(app_module, 'cache', Cache(app_module.app, config={'CACHE_TYPE': 'SimpleCache'}))
+    client = app_module.app.test_client()
+
+    df = pd.DataFrame([['¿Cuál es tu edad?']])
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as f:
+        df.to_excel(f.name, index=False, header=False)
+
+    responses = []
+    for _ in range(2):
+        with open(f.name, 'rb') as file:
+            responses.append(client.post('/upload', data={'file': (file, 'questions.xlsx')}))
+    os.unlink(f.name)
+
+    assert len(calls) == 1
+    assert responses[1].status_code == 200
+    assert responses[1].get_json() == responses[0].get_json()
+    assert responses[1].get_json()['results'][0]['english_translation'] == 'What is your age?'
+
+def test_codes_are_passed_through_without_api_call(deepseek):
+    """Test that short numeric codes and punctuation skip the DeepSeek API."""
+    import app as app_module
+
+    deepseek()
+
+    results = app_module.process_question_batch([(1, 2, '99'), (2, 3, '1.'), (3, 4, '---')])
+
+    assert [r['english_translation'] for r in results] == ['99', '1.', '---']
+    assert [r['row_number'] for r in results] == [2, 3, 4]
+
+
 if __name__ == '__main__':
     pytest.main([__file__]) 
\ No newline at end of file